@@ -2,18 +2,86 @@ import pandas as pd
 import json
 import ast
 import numpy as np
-from database import DatabaseConnection
+from quarantine import QuarantineWriter
+import mmap_ingest
 import logging
+import sys
+import time
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
+class FlagDictionaryFullError(RuntimeError):
+    """Raised when flag_values has no TINYINT code left for a new flag string"""
+
+
 class AdvancedPropertyETL:
-    def __init__(self, db_connection):
+    # Source field -> cleaned numeric column, shared by every run in the process
+    NUMERIC_MAPPINGS = {
+        'Tax_Rate': 'tax_rate',
+        'SQFT_Basement': 'sqft_basement',
+        'Year_Built': 'year_built',
+        'SQFT_MU': 'sqft_mu',
+        'SQFT_Total': 'sqft_total',
+        'Bed': 'bed',
+        'Bath': 'bath',
+        'Net_Yield': 'net_yield',
+        'IRR': 'irr',
+        'Neighborhood_Rating': 'neighborhood_rating',
+        'Latitude': 'latitude',
+        'Longitude': 'longitude',
+        'Taxes': 'taxes',
+        'School_Average': 'school_average'
+    }
+
+    CATEGORICAL_COLUMNS = [
+        'State', 'Market', 'Property_Type', 'Flood', 'Highway', 'Train', 'HTW', 'Pool',
+        'Commercial', 'Water', 'Sewage', 'Parking', 'BasementYesNo', 'Layout',
+        'Reviewed_Status', 'Most_Recent_Status', 'Source', 'Occupancy', 'Rent_Restricted'
+    ]
+
+    # Derived investment metrics: name -> formula over NumPy arrays aligned by property.
+    # Inputs are the first valuation and rehab estimate of each property plus its sqft_total and taxes.
+    METRIC_FORMULAS = {
+        'gross_rent_yield': lambda c: c['expected_rent'] * 12 / c['list_price'],
+        'after_tax_rent_yield': lambda c: (c['expected_rent'] * 12 - c['taxes']) / c['list_price'],
+        'arv_rehab_spread': lambda c: c['arv'] - c['underwriting_rehab'],
+        'price_per_sqft': lambda c: c['list_price'] / c['sqft_total']
+    }
+
+    VALUATION_COLUMNS = ['property_id', 'sequence_number', 'previous_rent', 'list_price', 'zestimate', 'arv',
+                         'expected_rent', 'rent_zestimate', 'low_fmr', 'high_fmr', 'redfin_value']
+
+    REHAB_ESTIMATE_COLUMNS = ['property_id', 'sequence_number', 'underwriting_rehab', 'rehab_calculation']
+
+    REHAB_FLAG_FIELDS = ['Paint', 'Flooring_Flag', 'Foundation_Flag', 'Roof_Flag', 'HVAC_Flag', 'Kitchen_Flag',
+                         'Bathroom_Flag', 'Appliances_Flag', 'Windows_Flag', 'Landscaping_Flag', 'Trashout_Flag']
+
+    # Length of flag_values.flag_value
+    FLAG_VALUE_MAX_LENGTH = 50
+
+    @classmethod
+    def select_metric_formulas(cls, names):
+        """Return the METRIC_FORMULAS subset for a comma-separated list of metric names"""
+        selected = [name.strip() for name in names.split(',') if name.strip()]
+        unknown = [name for name in selected if name not in cls.METRIC_FORMULAS]
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(unknown)}; available: {', '.join(cls.METRIC_FORMULAS)}")
+        return {name: cls.METRIC_FORMULAS[name] for name in selected}
+
+    def __init__(self, db_connection, cdc_log=None, quarantine=None, batch_size=1000, metric_formulas=None):
         self.db = db_connection
+        self.metric_formulas = metric_formulas if metric_formulas is not None else self.METRIC_FORMULAS
+        self.valuation_frame = pd.DataFrame(columns=self.VALUATION_COLUMNS)
+        self.rehab_frame = pd.DataFrame(columns=self.REHAB_ESTIMATE_COLUMNS)
+        self.metrics_frame = None
+        self.cdc_log = cdc_log
+        self.quarantine = quarantine or QuarantineWriter('quarantine/rejected_rows.jsonl')
+        self.batch_size = batch_size
         self.property_mapping = {}
         self.df = None
+        self.flag_codes = {}
 
     def extract_data(self, json_file_path):
         """Extract data from JSON file"""
@@ -29,6 +97,20 @@ class AdvancedPropertyETL:
             logging.error(f"Error extracting data: {e}")
             raise
 
+    def extract_data_mmap(self, json_file_path, workers=1):
+        """Extract data from a JSON array or JSONL file through a memory map"""
+        try:
+            raw_data, workers_used = mmap_ingest.read_records(json_file_path, workers=workers)
+
+            self.df = pd.DataFrame(raw_data)
+            logging.info(f"Extracted {len(self.df)} records from {json_file_path} "
+                         f"(mmap, {mmap_ingest.PARSER_NAME} parser, {workers_used} workers)")
+            return self.df
+
+        except Exception as e:
+            logging.error(f"Error extracting data: {e}")
+            raise
+
     def clean_data(self):
         """Clean and validate the data"""
         logging.info("Starting data cleaning...")
@@ -37,55 +119,139 @@ class AdvancedPropertyETL:
         self.df = self.df.fillna('')
 
         # Clean numeric columns with proper validation
-        numeric_mappings = {
-            'Tax_Rate': 'tax_rate',
-            'SQFT_Basement': 'sqft_basement',
-            'Year_Built': 'year_built',
-            'SQFT_MU': 'sqft_mu',
-            'SQFT_Total': 'sqft_total',
-            'Bed': 'bed',
-            'Bath': 'bath',
-            'Net_Yield': 'net_yield',
-            'IRR': 'irr',
-            'Neighborhood_Rating': 'neighborhood_rating',
-            'Latitude': 'latitude',
-            'Longitude': 'longitude',
-            'Taxes': 'taxes',
-            'School_Average': 'school_average'
-        }
-
-        for original_col, clean_col in numeric_mappings.items():
+        for original_col, clean_col in self.NUMERIC_MAPPINGS.items():
             if original_col in self.df.columns:
                 self.df[clean_col] = pd.to_numeric(self.df[original_col], errors='coerce')
 
         logging.info("Data cleaning completed")
         return self.df
 
-    def parse_nested_json(self, json_string):
-        """Parse nested JSON string safely"""
-        # Handle pandas Series and other array-like objects
-        if hasattr(json_string, '__iter__') and not isinstance(json_string, (str, dict)):
-            # If it's already a list, return it directly
-            if isinstance(json_string, list):
-                return json_string
+    def encode_categoricals(self):
+        """Dictionary-encode low-cardinality string columns"""
+        # Categoricals keep one string object per distinct value, shared by every row tuple
+        for col in self.CATEGORICAL_COLUMNS:
+            if col in self.df.columns:
+                self.df[col] = self.df[col].astype('category')
+
+        logging.info("Categorical encoding completed")
+        return self.df
+
+    def load_flag_dictionary(self):
+        """Load existing flag codes so codes stay stable across runs"""
+        self.db.cursor.execute("SELECT flag_id, flag_value FROM flag_values")
+        for flag_id, flag_value in self.db.cursor.fetchall():
+            self.flag_codes[sys.intern(flag_value)] = flag_id
+
+    def lookup_flag_id(self, value):
+        """Return the flag_id MySQL holds for a flag string, or None"""
+        self.db.cursor.execute("SELECT flag_id FROM flag_values WHERE flag_value = %s", (value,))
+        row = self.db.cursor.fetchone()
+        return row[0] if row else None
+
+    def encode_flag(self, value):
+        """Return the flag_values code for a flag string, adding it to the dictionary as needed"""
+        if value is None or value == '':
+            return None
+
+        value = sys.intern(str(value))
+        if value not in self.flag_codes:
+            if len(value) > self.FLAG_VALUE_MAX_LENGTH:
+                raise ValueError(f"Flag value longer than {self.FLAG_VALUE_MAX_LENGTH} characters: {value!r}")
+
+            # MySQL assigns the code, so concurrent loads agree on it; another writer may have added the
+            # value since load_flag_dictionary, in which case the insert is ignored and its code is read back
+            flag_id = self.lookup_flag_id(value)
+            if flag_id is None:
+                self.db.cursor.execute("INSERT IGNORE INTO flag_values (flag_value) VALUES (%s)", (value,))
+                self.db.connection.commit()
+                flag_id = self.lookup_flag_id(value)
+                if flag_id is None:
+                    raise FlagDictionaryFullError(
+                        f"No flag_values code left for {value!r}; flag_id is a TINYINT (max 255)")
+                logging.info(f"Added flag dictionary value {value!r} as {flag_id}")
+            self.flag_codes[value] = flag_id
+        return self.flag_codes[value]
+
+    def emit_changes(self, table, columns, rows, key_columns, operation='insert'):
+        """Record committed row changes in the CDC event log, if one is configured"""
+        if self.cdc_log is not None and rows:
+            self.cdc_log.append(table, operation, columns, rows, key_columns)
+            # Flush per table: each table commits on its own, so a later failure must not lose these events
+            self.cdc_log.flush()
+
+    def parse_nested_json(self, json_string, column=None, row_index=None):
+        """Parse nested JSON string safely, quarantining malformed payloads"""
+        # JSON/JSONL input delivers nested fields already parsed
+        if isinstance(json_string, list):
+            return json_string
+
+        if pd.api.types.is_scalar(json_string) and pd.isna(json_string):
             return []
-            
-        if not json_string or json_string == '' or pd.isna(json_string):
+
+        if not isinstance(json_string, str):
+            if hasattr(json_string, '__len__') and len(json_string) == 0:
+                return []
+            self.quarantine.record('transform', column, f"Expected a list, got {type(json_string).__name__}",
+                                   json_string, row_index)
+            return []
+
+        if not json_string.strip():
             return []
 
         try:
-            if isinstance(json_string, str):
-                return ast.literal_eval(json_string)
-            elif isinstance(json_string, list):
-                return json_string
-            else:
+            parsed = ast.literal_eval(json_string)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError) as e:
+            # Python literal syntax failed; accept the same payload written as JSON (true/false/null)
+            try:
+                parsed = json.loads(json_string)
+            except ValueError:
+                self.quarantine.record('transform', column, f"Malformed nested payload: {e}", json_string,
+                                       row_index)
                 return []
-        except:
+
+        if not isinstance(parsed, list):
+            self.quarantine.record('transform', column, f"Expected a list, got {type(parsed).__name__}",
+                                   json_string, row_index)
             return []
+        return parsed
+
+    def insert_rows(self, table, insert_query, rows):
+        """Insert rows in committed batches and return the positions of the accepted rows"""
+        accepted = []
+        for start in range(0, len(rows), self.batch_size):
+            accepted.extend(self._insert_batch(table, insert_query, rows[start:start + self.batch_size], start))
+
+        rejected = len(rows) - len(accepted)
+        if rejected:
+            logging.warning(f"Quarantined {rejected} rejected {table} rows")
+        return accepted
+
+    def _insert_batch(self, table, insert_query, batch, offset):
+        """Insert a batch, bisecting a failing batch until only the bad rows are rejected"""
+        # Imported lazily so extract/transform-only runs never load the MySQL driver
+        from mysql.connector import DatabaseError, OperationalError, ProgrammingError
+
+        try:
+            self.db.cursor.executemany(insert_query, batch)
+            self.db.connection.commit()
+            return list(range(offset, offset + len(batch)))
+        except (OperationalError, ProgrammingError):
+            # Connection and SQL errors are not caused by individual rows
+            raise
+        except DatabaseError as e:
+            self.db.connection.rollback()
+            if len(batch) == 1:
+                self.quarantine.record('load', table, str(e), batch[0], offset)
+                return []
+
+            mid = len(batch) // 2
+            return (self._insert_batch(table, insert_query, batch[:mid], offset) +
+                    self._insert_batch(table, insert_query, batch[mid:], offset + mid))
 
     def load_properties(self):
         """Load main property records"""
         properties_data = []
+        property_indexes = []
 
         for idx, row in self.df.iterrows():
             # Extract all property fields according to field config
@@ -124,6 +290,7 @@ class AdvancedPropertyETL:
                 float(row.get('school_average', 0)) if pd.notna(row.get('school_average')) else None
             )
             properties_data.append(property_data)
+            property_indexes.append(idx)
 
         # Bulk insert properties
         insert_query = """
@@ -136,17 +303,45 @@ class AdvancedPropertyETL:
         """
 
         try:
-            self.db.cursor.executemany(insert_query, properties_data)
-            self.db.connection.commit()
+            self.db.cursor.execute("SELECT MAX(property_id) FROM properties")
+            max_id_before = self.db.cursor.fetchone()[0] or 0
 
-            # Create property mapping
-            self.db.cursor.execute("SELECT property_id FROM properties ORDER BY property_id")
-            property_ids = [row[0] for row in self.db.cursor.fetchall()]
+            accepted = self.insert_rows('properties', insert_query, properties_data)
 
-            for idx, prop_id in enumerate(property_ids[-len(self.df):]):
-                self.property_mapping[idx] = prop_id
+            # Create property mapping for the accepted rows, which were inserted in order.
+            # Only ids assigned by this load are read, so the cost doesn't grow with the table.
+            self.db.cursor.execute(
+                "SELECT property_id FROM properties WHERE property_id > %s ORDER BY property_id", (max_id_before,))
+            property_ids = [row[0] for row in self.db.cursor.fetchall()]
+            if len(property_ids) != len(accepted):
+                raise RuntimeError(f"Expected {len(accepted)} new property ids, found {len(property_ids)}; "
+                                   f"is another writer loading properties?")
+
+            for pos, prop_id in zip(accepted, property_ids):
+                self.property_mapping[property_indexes[pos]] = prop_id
+
+            # Keep the full source record of rejected properties so their child rows can be replayed
+            source_columns = [col for col in self.df.columns if col not in self.NUMERIC_MAPPINGS.values()]
+            for idx in property_indexes:
+                if idx not in self.property_mapping:
+                    self.quarantine.record(
+                        'load', 'source_records',
+                        "Parent property rejected; its leads, taxes, HOA, valuation and rehab rows were not loaded",
+                        self.df.loc[idx, source_columns].to_dict(), idx
+                    )
+
+            self.emit_changes(
+                'properties',
+                ['property_id', 'property_title', 'address', 'street_address', 'city', 'state', 'zip',
+                 'property_type', 'market', 'year_built', 'flood', 'highway', 'train', 'tax_rate',
+                 'sqft_basement', 'htw', 'pool', 'commercial', 'water', 'sewage', 'sqft_mu', 'sqft_total',
+                 'parking', 'bed', 'bath', 'basement_yes_no', 'layout', 'neighborhood_rating',
+                 'latitude', 'longitude', 'subdivision', 'school_average'],
+                [(prop_id,) + properties_data[pos] for pos, prop_id in zip(accepted, property_ids)],
+                ['property_id']
+            )
 
-            logging.info(f"Loaded {len(properties_data)} properties")
+            logging.info(f"Loaded {len(accepted)} properties")
 
         except Exception as e:
             logging.error(f"Error loading properties: {e}")
@@ -181,9 +376,15 @@ class AdvancedPropertyETL:
         """
 
         try:
-            self.db.cursor.executemany(insert_query, leads_data)
-            self.db.connection.commit()
-            logging.info(f"Loaded {len(leads_data)} lead records")
+            accepted = self.insert_rows('leads', insert_query, leads_data)
+            self.emit_changes(
+                'leads',
+                ['property_id', 'reviewed_status', 'most_recent_status', 'source', 'occupancy', 'net_yield',
+                 'irr', 'selling_reason', 'seller_retained_broker', 'final_reviewer', 'rent_restricted'],
+                [leads_data[pos] for pos in accepted],
+                ['property_id']
+            )
+            logging.info(f"Loaded {len(accepted)} lead records")
         except Exception as e:
             logging.error(f"Error loading leads: {e}")
             self.db.connection.rollback()
@@ -206,9 +407,10 @@ class AdvancedPropertyETL:
         if taxes_data:
             insert_query = "INSERT INTO taxes (property_id, taxes, tax_year) VALUES (%s, %s, %s)"
             try:
-                self.db.cursor.executemany(insert_query, taxes_data)
-                self.db.connection.commit()
-                logging.info(f"Loaded {len(taxes_data)} tax records")
+                accepted = self.insert_rows('taxes', insert_query, taxes_data)
+                self.emit_changes('taxes', ['property_id', 'taxes', 'tax_year'],
+                                  [taxes_data[pos] for pos in accepted], ['property_id', 'tax_year'])
+                logging.info(f"Loaded {len(accepted)} tax records")
             except Exception as e:
                 logging.error(f"Error loading taxes: {e}")
                 self.db.connection.rollback()
@@ -223,16 +425,23 @@ class AdvancedPropertyETL:
                 property_id = self.property_mapping[idx]
 
                 # Parse HOA list
-                hoa_list = self.parse_nested_json(row.get('HOA', ''))
+                hoa_list = self.parse_nested_json(row.get('HOA', ''), 'HOA', idx)
 
                 for seq_num, hoa_record in enumerate(hoa_list, 1):
                     if isinstance(hoa_record, dict):
-                        hoa_data.append((
-                            property_id,
-                            float(hoa_record.get('HOA', 0)) if hoa_record.get('HOA') else None,
-                            hoa_record.get('HOA_Flag', ''),
-                            seq_num
-                        ))
+                        try:
+                            hoa_data.append((
+                                property_id,
+                                float(hoa_record.get('HOA', 0)) if hoa_record.get('HOA') else None,
+                                self.encode_flag(hoa_record.get('HOA_Flag')),
+                                seq_num
+                            ))
+                        except (ValueError, TypeError) as e:
+                            self.quarantine.record('transform', 'hoa_details', f"Invalid value: {e}",
+                                                   hoa_record, idx)
+                    else:
+                        self.quarantine.record('transform', 'hoa_details', "HOA entry is not an object",
+                                               hoa_record, idx)
 
         if hoa_data:
             insert_query = """
@@ -240,9 +449,10 @@ class AdvancedPropertyETL:
             VALUES (%s, %s, %s, %s)
             """
             try:
-                self.db.cursor.executemany(insert_query, hoa_data)
-                self.db.connection.commit()
-                logging.info(f"Loaded {len(hoa_data)} HOA detail records")
+                accepted = self.insert_rows('hoa_details', insert_query, hoa_data)
+                self.emit_changes('hoa_details', ['property_id', 'hoa_fee', 'hoa_flag', 'sequence_number'],
+                                  [hoa_data[pos] for pos in accepted], ['property_id', 'sequence_number'])
+                logging.info(f"Loaded {len(accepted)} HOA detail records")
             except Exception as e:
                 logging.error(f"Error loading HOA details: {e}")
                 self.db.connection.rollback()
@@ -257,23 +467,30 @@ class AdvancedPropertyETL:
                 property_id = self.property_mapping[idx]
 
                 # Parse Valuation list
-                valuation_list = self.parse_nested_json(row.get('Valuation', ''))
+                valuation_list = self.parse_nested_json(row.get('Valuation', ''), 'Valuation', idx)
 
                 for seq_num, val_record in enumerate(valuation_list, 1):
                     if isinstance(val_record, dict):
-                        valuation_data.append((
-                            property_id,
-                            seq_num,
-                            float(val_record.get('Previous_Rent', 0)) if val_record.get('Previous_Rent') else None,
-                            float(val_record.get('List_Price', 0)) if val_record.get('List_Price') else None,
-                            float(val_record.get('Zestimate', 0)) if val_record.get('Zestimate') else None,
-                            float(val_record.get('ARV', 0)) if val_record.get('ARV') else None,
-                            float(val_record.get('Expected_Rent', 0)) if val_record.get('Expected_Rent') else None,
-                            float(val_record.get('Rent_Zestimate', 0)) if val_record.get('Rent_Zestimate') else None,
-                            float(val_record.get('Low_FMR', 0)) if val_record.get('Low_FMR') else None,
-                            float(val_record.get('High_FMR', 0)) if val_record.get('High_FMR') else None,
-                            float(val_record.get('Redfin_Value', 0)) if val_record.get('Redfin_Value') else None
-                        ))
+                        try:
+                            valuation_data.append((
+                                property_id,
+                                seq_num,
+                                float(val_record.get('Previous_Rent', 0)) if val_record.get('Previous_Rent') else None,
+                                float(val_record.get('List_Price', 0)) if val_record.get('List_Price') else None,
+                                float(val_record.get('Zestimate', 0)) if val_record.get('Zestimate') else None,
+                                float(val_record.get('ARV', 0)) if val_record.get('ARV') else None,
+                                float(val_record.get('Expected_Rent', 0)) if val_record.get('Expected_Rent') else None,
+                                float(val_record.get('Rent_Zestimate', 0)) if val_record.get('Rent_Zestimate') else None,
+                                float(val_record.get('Low_FMR', 0)) if val_record.get('Low_FMR') else None,
+                                float(val_record.get('High_FMR', 0)) if val_record.get('High_FMR') else None,
+                                float(val_record.get('Redfin_Value', 0)) if val_record.get('Redfin_Value') else None
+                            ))
+                        except (ValueError, TypeError) as e:
+                            self.quarantine.record('transform', 'valuation_details', f"Invalid value: {e}",
+                                                   val_record, idx)
+                    else:
+                        self.quarantine.record('transform', 'valuation_details', "Valuation entry is not an object",
+                                               val_record, idx)
 
         if valuation_data:
             insert_query = """
@@ -283,9 +500,12 @@ class AdvancedPropertyETL:
             ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """
             try:
-                self.db.cursor.executemany(insert_query, valuation_data)
-                self.db.connection.commit()
-                logging.info(f"Loaded {len(valuation_data)} valuation detail records")
+                accepted = self.insert_rows('valuation_details', insert_query, valuation_data)
+                accepted_rows = [valuation_data[pos] for pos in accepted]
+                self.valuation_frame = pd.DataFrame(accepted_rows, columns=self.VALUATION_COLUMNS)
+                self.emit_changes('valuation_details', self.VALUATION_COLUMNS, accepted_rows,
+                                  ['property_id', 'sequence_number'])
+                logging.info(f"Loaded {len(accepted)} valuation detail records")
             except Exception as e:
                 logging.error(f"Error loading valuation details: {e}")
                 self.db.connection.rollback()
@@ -295,26 +515,35 @@ class AdvancedPropertyETL:
         """Load multiple rehab estimates per property with detailed breakdown"""
         rehab_estimates_data = []
         rehab_details_data = []
+        rehab_lists = {}
 
         for idx, row in self.df.iterrows():
             if idx in self.property_mapping:
                 property_id = self.property_mapping[idx]
 
-                # Parse Rehab list
-                rehab_list = self.parse_nested_json(row.get('Rehab', ''))
+                # Parse Rehab list once; the details pass below reuses it
+                rehab_list = self.parse_nested_json(row.get('Rehab', ''), 'Rehab', idx)
+                rehab_lists[idx] = rehab_list
 
                 for seq_num, rehab_record in enumerate(rehab_list, 1):
                     if isinstance(rehab_record, dict):
-                        # Insert rehab estimate
-                        rehab_estimate_data = (
-                            property_id,
-                            seq_num,
-                            float(rehab_record.get('Underwriting_Rehab', 0)) if rehab_record.get(
-                                'Underwriting_Rehab') else None,
-                            float(rehab_record.get('Rehab_Calculation', 0)) if rehab_record.get(
-                                'Rehab_Calculation') else None
-                        )
-                        rehab_estimates_data.append(rehab_estimate_data)
+                        try:
+                            # Insert rehab estimate
+                            rehab_estimate_data = (
+                                property_id,
+                                seq_num,
+                                float(rehab_record.get('Underwriting_Rehab', 0)) if rehab_record.get(
+                                    'Underwriting_Rehab') else None,
+                                float(rehab_record.get('Rehab_Calculation', 0)) if rehab_record.get(
+                                    'Rehab_Calculation') else None
+                            )
+                            rehab_estimates_data.append(rehab_estimate_data)
+                        except (ValueError, TypeError) as e:
+                            self.quarantine.record('transform', 'rehab_estimates', f"Invalid value: {e}",
+                                                   rehab_record, idx)
+                    else:
+                        self.quarantine.record('transform', 'rehab_estimates', "Rehab entry is not an object",
+                                               rehab_record, idx)
 
         # Insert rehab estimates first
         if rehab_estimates_data:
@@ -323,42 +552,41 @@ class AdvancedPropertyETL:
             VALUES (%s, %s, %s, %s)
             """
             try:
-                self.db.cursor.executemany(estimates_query, rehab_estimates_data)
-                self.db.connection.commit()
+                self.db.cursor.execute("SELECT MAX(rehab_estimate_id) FROM rehab_estimates")
+                max_id_before = self.db.cursor.fetchone()[0] or 0
 
-                # Now get the rehab_estimate_ids for details
+                accepted_estimates = self.insert_rows('rehab_estimates', estimates_query, rehab_estimates_data)
+                accepted_rows = [rehab_estimates_data[pos] for pos in accepted_estimates]
+                self.rehab_frame = pd.DataFrame(accepted_rows, columns=self.REHAB_ESTIMATE_COLUMNS)
+                self.emit_changes('rehab_estimates', self.REHAB_ESTIMATE_COLUMNS, accepted_rows,
+                                  ['property_id', 'sequence_number'])
+
+                # Get the rehab_estimate_ids assigned by this load for the details
                 self.db.cursor.execute("""
-                    SELECT rehab_estimate_id, property_id, sequence_number 
-                    FROM rehab_estimates 
-                    ORDER BY rehab_estimate_id
-                """)
+                    SELECT rehab_estimate_id, property_id, sequence_number
+                    FROM rehab_estimates
+                    WHERE rehab_estimate_id > %s
+                """, (max_id_before,))
                 rehab_id_mapping = {(row[1], row[2]): row[0] for row in self.db.cursor.fetchall()}
 
-                # Prepare rehab details data
-                for idx, row in self.df.iterrows():
-                    if idx in self.property_mapping:
-                        property_id = self.property_mapping[idx]
-                        rehab_list = self.parse_nested_json(row.get('Rehab', ''))
-
-                        for seq_num, rehab_record in enumerate(rehab_list, 1):
-                            if isinstance(rehab_record, dict):
-                                rehab_estimate_id = rehab_id_mapping.get((property_id, seq_num))
-                                if rehab_estimate_id:
-                                    rehab_detail_data = (
-                                        rehab_estimate_id,
-                                        rehab_record.get('Paint', ''),
-                                        rehab_record.get('Flooring_Flag', ''),
-                                        rehab_record.get('Foundation_Flag', ''),
-                                        rehab_record.get('Roof_Flag', ''),
-                                        rehab_record.get('HVAC_Flag', ''),
-                                        rehab_record.get('Kitchen_Flag', ''),
-                                        rehab_record.get('Bathroom_Flag', ''),
-                                        rehab_record.get('Appliances_Flag', ''),
-                                        rehab_record.get('Windows_Flag', ''),
-                                        rehab_record.get('Landscaping_Flag', ''),
-                                        rehab_record.get('Trashout_Flag', '')
-                                    )
+                # Prepare rehab details data; details of rejected estimates have no id and are quarantined
+                for idx, rehab_list in rehab_lists.items():
+                    property_id = self.property_mapping[idx]
+
+                    for seq_num, rehab_record in enumerate(rehab_list, 1):
+                        if isinstance(rehab_record, dict):
+                            rehab_estimate_id = rehab_id_mapping.get((property_id, seq_num))
+                            if rehab_estimate_id:
+                                try:
+                                    rehab_detail_data = (rehab_estimate_id,) + tuple(
+                                        self.encode_flag(rehab_record.get(field)) for field in self.REHAB_FLAG_FIELDS)
                                     rehab_details_data.append(rehab_detail_data)
+                                except (ValueError, TypeError) as e:
+                                    self.quarantine.record('transform', 'rehab_details', f"Invalid value: {e}",
+                                                           rehab_record, idx)
+                            else:
+                                self.quarantine.record('load', 'rehab_details', "Parent rehab estimate rejected",
+                                                       rehab_record, idx)
 
                 # Insert rehab details
                 if rehab_details_data:
@@ -369,27 +597,99 @@ class AdvancedPropertyETL:
                         landscaping_flag, trashout_flag
                     ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     """
-                    self.db.cursor.executemany(details_query, rehab_details_data)
-                    self.db.connection.commit()
+                    accepted_details = self.insert_rows('rehab_details', details_query, rehab_details_data)
+                    self.emit_changes(
+                        'rehab_details',
+                        ['rehab_estimate_id', 'paint', 'flooring_flag', 'foundation_flag', 'roof_flag',
+                         'hvac_flag', 'kitchen_flag', 'bathroom_flag', 'appliances_flag', 'windows_flag',
+                         'landscaping_flag', 'trashout_flag'],
+                        [rehab_details_data[pos] for pos in accepted_details],
+                        ['rehab_estimate_id']
+                    )
+                else:
+                    accepted_details = []
 
                 logging.info(
-                    f"Loaded {len(rehab_estimates_data)} rehab estimates and {len(rehab_details_data)} rehab details")
+                    f"Loaded {len(accepted_estimates)} rehab estimates and {len(accepted_details)} rehab details")
 
             except Exception as e:
                 logging.error(f"Error loading rehab data: {e}")
                 self.db.connection.rollback()
                 raise
 
-    def run_etl(self, json_file_path):
+    def compute_metrics(self):
+        """Compute derived investment metrics for all loaded properties in bulk"""
+        # One row per loaded property: first valuation and rehab estimate, plus property figures
+        loaded_rows = list(self.property_mapping.keys())
+        property_index = pd.Index(list(self.property_mapping.values()), name='property_id')
+        base = pd.DataFrame(index=property_index)
+        for col in ('sqft_total', 'taxes'):
+            # Inputs missing from the source file (or an empty file) become NaN, not a KeyError
+            base[col] = self.df.loc[loaded_rows, col].to_numpy() if col in self.df.columns else np.nan
+
+        for frame in (self.valuation_frame, self.rehab_frame):
+            first = frame[frame['sequence_number'] == 1].drop(columns='sequence_number')
+            base = base.join(first.set_index('property_id'), how='left')
+
+        inputs = {col: base[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in base.columns}
+        metrics = {}
+
+        # Division by zero or missing inputs yield inf/NaN, which are stored as no value
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for name, formula in self.metric_formulas.items():
+                start = time.perf_counter()
+                values = np.asarray(formula(inputs), dtype=np.float64)
+                values[~np.isfinite(values)] = np.nan
+                metrics[name] = values
+                logging.info(f"Computed {name} for {len(values)} properties in "
+                             f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+        self.metrics_frame = pd.DataFrame(metrics, index=property_index)
+        return self.metrics_frame
+
+    def load_metrics(self):
+        """Load computed metrics as (property_id, metric_name, metric_value) rows"""
+        if self.metrics_frame is None or self.metrics_frame.empty:
+            return
+
+        property_ids = self.metrics_frame.index.to_numpy()
+        metrics_data = []
+        for name in self.metrics_frame.columns:
+            values = self.metrics_frame[name].to_numpy()
+            present = ~np.isnan(values)
+            metrics_data.extend(zip(property_ids[present].tolist(), [name] * int(present.sum()),
+                                    values[present].tolist()))
+
+        if metrics_data:
+            insert_query = """
+            INSERT INTO property_metrics (property_id, metric_name, metric_value)
+            VALUES (%s, %s, %s)
+            """
+            try:
+                accepted = self.insert_rows('property_metrics', insert_query, metrics_data)
+                self.emit_changes('property_metrics', ['property_id', 'metric_name', 'metric_value'],
+                                  [metrics_data[pos] for pos in accepted], ['property_id', 'metric_name'])
+                logging.info(f"Loaded {len(accepted)} property metric values")
+            except Exception as e:
+                logging.error(f"Error loading property metrics: {e}")
+                self.db.connection.rollback()
+                raise
+
+    def run_etl(self, json_file_path, use_mmap=False, workers=1):
         """Run the complete advanced ETL process"""
         try:
             logging.info("Starting Advanced ETL process...")
 
             # Extract and Transform
-            self.extract_data(json_file_path)
+            if use_mmap:
+                self.extract_data_mmap(json_file_path, workers=workers)
+            else:
+                self.extract_data(json_file_path)
             self.clean_data()
+            self.encode_categoricals()
 
             # Load data in dependency order
+            self.load_flag_dictionary()
             self.load_properties()
             self.load_leads()
             self.load_taxes()
@@ -397,15 +697,31 @@ class AdvancedPropertyETL:
             self.load_valuation_details()
             self.load_rehab_estimates()
 
+            # Derived metrics from the flattened valuation/rehab frames
+            self.compute_metrics()
+            self.load_metrics()
+
+            if self.quarantine.total():
+                logging.warning(f"{self.quarantine.total()} items quarantined to {self.quarantine.file_path}: "
+                                f"{dict(self.quarantine.counts)}")
+
             logging.info("Advanced ETL process completed successfully!")
 
         except Exception as e:
             logging.error(f"Advanced ETL process failed: {e}")
             raise
 
+        finally:
+            self.quarantine.close()
+            if self.cdc_log is not None:
+                self.cdc_log.flush()
+                logging.info(f"CDC log written through offset {self.cdc_log.next_offset - 1}")
+
 
 def main():
     """Main execution function"""
+    from database import DatabaseConnection
+
     db = DatabaseConnection()
 
     if not db.connect():
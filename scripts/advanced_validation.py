@@ -16,7 +16,8 @@ class AdvancedDataValidator:
             'hoa_details': "SELECT COUNT(*) FROM hoa_details",
             'valuation_details': "SELECT COUNT(*) FROM valuation_details",
             'rehab_estimates': "SELECT COUNT(*) FROM rehab_estimates",
-            'rehab_details': "SELECT COUNT(*) FROM rehab_details"
+            'rehab_details': "SELECT COUNT(*) FROM rehab_details",
+            'property_metrics': "SELECT COUNT(*) FROM property_metrics"
         }
 
         logging.info("=== RECORD COUNTS ===")
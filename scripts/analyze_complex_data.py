@@ -5,11 +5,11 @@ import ast
 from collections import Counter
 
 
-def analyze_nested_columns():
+def analyze_nested_columns(json_file_path='C:/Users/grant/Desktop/Assignmnet 2/data_engineer_assessment_Priyansh_Kaushik/data/fake_property_data.json'):
     """Analyze the nested JSON structures in complex columns"""
 
     # Load the data
-    with open('C:/Users/grant/Desktop/Assignmnet 2/data_engineer_assessment_Priyansh_Kaushik/data/fake_property_data.json', 'r') as f:
+    with open(json_file_path, 'r') as f:
         data = json.load(f)
     df = pd.DataFrame(data)
 
@@ -115,9 +115,9 @@ def analyze_nested_columns():
     return val_keys, hoa_keys, rehab_keys
 
 
-def analyze_field_config_detailed():
+def analyze_field_config_detailed(config_path='C:/Users/grant/Desktop/Assignmnet 2/data_engineer_assessment_Priyansh_Kaushik/data/Field Config.xlsx'):
     """Get detailed field configuration mapping"""
-    config_df = pd.read_excel('C:/Users/grant/Desktop/Assignmnet 2/data_engineer_assessment_Priyansh_Kaushik/data/Field Config.xlsx')
+    config_df = pd.read_excel(config_path)
 
     print(f"\n5. FIELD CONFIGURATION MAPPING:")
     print("-" * 40)
@@ -0,0 +1,228 @@
+# scripts/cdc_log.py
+import gzip
+import json
+import os
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+INDEX_FILE = 'index.jsonl'
+
+
+def load_index(log_dir):
+    """Return the latest index entry of every segment, ordered by first offset"""
+    index_path = os.path.join(log_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return []
+
+    segments = {}
+    with open(index_path, 'r') as f:
+        for line in f:
+            # A line cut short by a concurrent append is skipped; it is complete on the next read
+            if line.endswith('\n') and line.strip():
+                entry = json.loads(line)
+                # Later entries for the same segment supersede earlier ones
+                segments[entry['segment']] = entry
+    return sorted(segments.values(), key=lambda entry: entry['first_offset'])
+
+
+def read_members(f, limit=None, chunk_size=1024 * 1024):
+    """Yield (end position, text) for each complete gzip member in the first limit bytes of a segment file.
+
+    Stops quietly at a member that is cut short or corrupt, e.g. a batch still being written.
+    """
+    remaining = limit
+    fed = 0
+    decompressor = zlib.decompressobj(wbits=31)
+    parts = []
+    data = b''
+    while True:
+        if not data:
+            if remaining == 0:
+                return
+            data = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not data:
+                return
+            fed += len(data)
+            if remaining is not None:
+                remaining -= len(data)
+
+        try:
+            parts.append(decompressor.decompress(data))
+        except zlib.error:
+            return
+
+        if decompressor.eof:
+            yield fed - len(decompressor.unused_data), b''.join(parts).decode('utf-8')
+            data = decompressor.unused_data
+            decompressor = zlib.decompressobj(wbits=31)
+            parts = []
+        else:
+            data = b''
+
+
+class CDCEventReader:
+    """Read-only consumer view of a CDC log; never modifies the log directory"""
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+
+    def read(self, from_offset=0):
+        """Yield indexed events with offset >= from_offset.
+
+        The index is re-read on every call, so a consumer tails the log by calling read again with the
+        offset after the last event it saw. Only bytes recorded in the index are read, so a batch the
+        writer is still flushing is never returned half-written.
+        """
+        for segment in load_index(self.log_dir):
+            if segment['last_offset'] < from_offset:
+                continue
+            with open(os.path.join(self.log_dir, segment['segment']), 'rb') as f:
+                for _, text in read_members(f, segment.get('bytes')):
+                    for line in text.splitlines():
+                        if line:
+                            event = json.loads(line)
+                            if event['offset'] >= from_offset:
+                                yield event
+
+
+class CDCEventLog:
+    """Append-only, gzip-compressed JSONL log of change events with an offset index.
+
+    This is the writer: opening it recovers (and may truncate) segments left by a crashed run, so only
+    the ETL process should construct it. Consumers use CDCEventReader.
+    """
+
+    OPERATIONS = ('insert', 'update', 'delete')
+
+    def __init__(self, log_dir, segment_max_bytes=64 * 1024 * 1024, batch_size=5000):
+        self.log_dir = log_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.batch_size = batch_size
+        self.run_id = uuid.uuid4().hex
+        self.pending = []
+        self.segments = []
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.segments = load_index(self.log_dir)
+        self._recover_unindexed_events()
+        self.next_offset = self.segments[-1]['last_offset'] + 1 if self.segments else 0
+
+    def _scan_segment(self, segment_path):
+        """Return (event count, last offset, size of the complete gzip members) of a segment file"""
+        events = 0
+        last_offset = None
+        position = 0
+        with open(segment_path, 'rb') as f:
+            # A batch cut short by a crash mid-write ends the scan
+            for position, text in read_members(f):
+                for line in text.splitlines():
+                    if line:
+                        events += 1
+                        last_offset = json.loads(line)['offset']
+
+        return events, last_offset, position
+
+    def _recover_unindexed_events(self):
+        """Re-index batches written after the last index update, e.g. after a crash between the two writes"""
+        indexed = {segment['segment'] for segment in self.segments}
+        orphans = sorted(name for name in os.listdir(self.log_dir)
+                         if name.startswith('segment-') and name.endswith('.jsonl.gz') and name not in indexed)
+        tail = [self.segments[-1]['segment']] if self.segments else []
+
+        for name in tail + orphans:
+            segment_path = os.path.join(self.log_dir, name)
+            entry = next((segment for segment in self.segments if segment['segment'] == name), None)
+            if entry is not None and os.path.getsize(segment_path) == entry.get('bytes'):
+                continue
+
+            events, last_offset, valid_bytes = self._scan_segment(segment_path)
+            if valid_bytes < os.path.getsize(segment_path):
+                # Drop a partially written trailing batch so appends start on a member boundary
+                with open(segment_path, 'r+b') as f:
+                    f.truncate(valid_bytes)
+
+            if last_offset is None:
+                if entry is None:
+                    os.remove(segment_path)
+                continue
+
+            if entry is None:
+                entry = {'segment': name, 'first_offset': int(name[len('segment-'):-len('.jsonl.gz')])}
+                self.segments.append(entry)
+            entry.update({'last_offset': last_offset, 'events': events, 'bytes': valid_bytes})
+            with open(os.path.join(self.log_dir, INDEX_FILE), 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+        self.segments.sort(key=lambda segment: segment['first_offset'])
+
+    def _current_segment(self):
+        """Return the segment to append to, starting a new one when the current is full"""
+        if self.segments:
+            segment = self.segments[-1]
+            segment_path = os.path.join(self.log_dir, segment['segment'])
+            if os.path.getsize(segment_path) < self.segment_max_bytes:
+                return segment
+
+        segment = {
+            'segment': f"segment-{self.next_offset:020d}.jsonl.gz",
+            'first_offset': self.next_offset,
+            'last_offset': self.next_offset - 1,
+            'events': 0,
+            'bytes': 0
+        }
+        self.segments.append(segment)
+        return segment
+
+    def append(self, table, operation, columns, rows, key_columns):
+        """Queue change events for rows of a table"""
+        if operation not in self.OPERATIONS:
+            raise ValueError(f"Unsupported CDC operation: {operation}")
+
+        timestamp = datetime.now(timezone.utc).isoformat()
+        for row in rows:
+            record = dict(zip(columns, row))
+            self.pending.append({
+                'run_id': self.run_id,
+                'ts': timestamp,
+                'table': table,
+                'op': operation,
+                'key': {col: record.get(col) for col in key_columns},
+                'before': record if operation == 'delete' else None,
+                'after': record if operation != 'delete' else None
+            })
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Write queued events as one compressed batch and update the offset index"""
+        if not self.pending:
+            return 0
+
+        segment = self._current_segment()
+        lines = []
+        for event in self.pending:
+            event['offset'] = self.next_offset
+            self.next_offset += 1
+            lines.append(json.dumps(event, default=str))
+
+        # Each batch is its own gzip member, so segments stay appendable and readable as one stream
+        segment_path = os.path.join(self.log_dir, segment['segment'])
+        with open(segment_path, 'ab') as f:
+            f.write(gzip.compress(('\n'.join(lines) + '\n').encode('utf-8')))
+            f.flush()
+            os.fsync(f.fileno())
+
+        written = len(self.pending)
+        segment['last_offset'] = self.next_offset - 1
+        segment['events'] += written
+        segment['bytes'] = os.path.getsize(segment_path)
+        with open(os.path.join(self.log_dir, INDEX_FILE), 'a') as f:
+            f.write(json.dumps(segment) + '\n')
+
+        self.pending = []
+        return written
+
+    def read(self, from_offset=0):
+        """Yield events with offset >= from_offset that this writer has flushed"""
+        return CDCEventReader(self.log_dir).read(from_offset)
@@ -0,0 +1,150 @@
+# scripts/cli.py
+import argparse
+import logging
+import sys
+
+# Each handler imports its modules when it runs, so the CLI itself loads none of them.
+# startup_benchmark.py reads those imports from the handlers to time each subcommand's cold start.
+
+
+def _extract(args):
+    """Extract records and report what was read"""
+    from advanced_etl_pipeline import AdvancedPropertyETL
+
+    etl = AdvancedPropertyETL(None)
+    if args.mmap:
+        df = etl.extract_data_mmap(args.json_file, workers=args.workers)
+    else:
+        df = etl.extract_data(args.json_file)
+    print(f"Records: {len(df)}")
+    print(f"Columns: {list(df.columns)}")
+
+
+def _transform(args):
+    """Extract and run the transform stages without touching the database"""
+    from advanced_etl_pipeline import AdvancedPropertyETL
+
+    etl = AdvancedPropertyETL(None)
+    if args.mmap:
+        etl.extract_data_mmap(args.json_file, workers=args.workers)
+    else:
+        etl.extract_data(args.json_file)
+    etl.clean_data()
+    df = etl.encode_categoricals()
+
+    numeric_columns = [col for col in AdvancedPropertyETL.NUMERIC_MAPPINGS.values() if col in df.columns]
+    print(f"Records: {len(df)}")
+    print(f"Missing numeric values:\n{df[numeric_columns].isna().sum()}")
+
+
+def _load(args):
+    """Run the full ETL into MySQL"""
+    from advanced_etl_pipeline import AdvancedPropertyETL
+    from database import DatabaseConnection
+
+    try:
+        metric_formulas = AdvancedPropertyETL.select_metric_formulas(args.metrics) if args.metrics else None
+    except ValueError as e:
+        logging.error(e)
+        return 2
+
+    db = DatabaseConnection()
+    if not db.connect():
+        return 1
+
+    try:
+        if args.schema:
+            logging.info("Creating final database schema...")
+            db.execute_script(args.schema)
+
+        cdc_log = None
+        if args.cdc_dir:
+            from cdc_log import CDCEventLog
+            cdc_log = CDCEventLog(args.cdc_dir)
+
+        etl = AdvancedPropertyETL(db, cdc_log=cdc_log, batch_size=args.batch_size, metric_formulas=metric_formulas)
+        etl.run_etl(args.json_file, use_mmap=args.mmap, workers=args.workers)
+    finally:
+        db.close()
+    return 0
+
+
+def _validate(args):
+    """Run the SQL validation checks against the loaded database"""
+    from advanced_validation import AdvancedDataValidator
+    from database import DatabaseConnection
+
+    db = DatabaseConnection()
+    if not db.connect():
+        return 1
+
+    try:
+        AdvancedDataValidator(db).run_validation()
+    finally:
+        db.close()
+    return 0
+
+
+def _profile(args):
+    """Profile nested columns and, optionally, the field configuration"""
+    from analyze_complex_data import analyze_field_config_detailed, analyze_nested_columns
+
+    analyze_nested_columns(args.json_file)
+    if args.field_config:
+        analyze_field_config_detailed(args.field_config)
+
+
+def _add_extract_options(parser):
+    parser.add_argument('json_file', help="Input JSON array or JSONL file")
+    parser.add_argument('--mmap', action='store_true', help="Use the memory-mapped extractor")
+    parser.add_argument('--workers', type=int, default=1, help="Parser worker processes (with --mmap, JSONL input only)")
+
+
+def build_parser():
+    """Build the argument parser for all subcommands"""
+    parser = argparse.ArgumentParser(prog='cli.py', description="Property data ETL command line")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    extract = subparsers.add_parser('extract', help="Read the input file and report its shape")
+    _add_extract_options(extract)
+    extract.set_defaults(handler=_extract)
+
+    transform = subparsers.add_parser('transform', help="Run extract and transform stages only")
+    _add_extract_options(transform)
+    transform.set_defaults(handler=_transform)
+
+    load = subparsers.add_parser('load', help="Run the full ETL into MySQL")
+    _add_extract_options(load)
+    load.add_argument('--schema', default=None, help="Create the schema from this SQL file first")
+    load.add_argument('--cdc-dir', default=None, help="Write CDC events to this directory")
+    load.add_argument('--batch-size', type=int, default=1000, help="Rows per insert batch")
+    load.add_argument('--metrics', default=None, help="Comma-separated derived metrics to compute (default: all)")
+    load.set_defaults(handler=_load)
+
+    validate = subparsers.add_parser('validate', help="Run validation queries against home_db")
+    validate.set_defaults(handler=_validate)
+
+    profile = subparsers.add_parser('profile', help="Profile nested columns of the input file")
+    profile.add_argument('json_file', help="Input JSON file")
+    profile.add_argument('--field-config', default=None, help="Path to Field Config.xlsx")
+    profile.set_defaults(handler=_profile)
+
+    return parser
+
+
+def command_handlers():
+    """Return {subcommand: handler function} as registered by build_parser"""
+    subparsers = next(action for action in build_parser()._actions
+                      if isinstance(action, argparse._SubParsersAction))
+    return {name: subparser.get_default('handler') for name, subparser in subparsers.choices.items()}
+
+
+def main(argv=None):
+    """Main execution function"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args(argv)
+    return args.handler(args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
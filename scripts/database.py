@@ -1,10 +1,6 @@
 # scripts/database.py
 import mysql.connector
 from mysql.connector import Error
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
 
 
 class DatabaseConnection:
@@ -14,6 +10,10 @@ class DatabaseConnection:
 
     def connect(self):
         """Establish database connection with correct credentials"""
+        # Loaded here rather than at import so commands that never connect skip it
+        from dotenv import load_dotenv
+        load_dotenv()
+
         try:
             # Use the exact credentials from docker-compose.initial.yml
             self.connection = mysql.connector.connect(
@@ -56,6 +56,23 @@ class DatabaseConnection:
 
         return False
 
+    def ensure_connected(self):
+        """Reconnect if the connection was dropped, reusing the existing connection settings"""
+        if self.connection and self.connection.is_connected():
+            return True
+
+        if self.connection:
+            try:
+                self.connection.reconnect(attempts=3, delay=2)
+                self.cursor = self.connection.cursor(buffered=True)
+                print(" Reconnected to MySQL database")
+                return True
+            except Error as e:
+                print(f" Error reconnecting to MySQL: {e}")
+                return False
+
+        return self.connect()
+
     def execute_script(self, script_path):
         """Execute SQL script from file"""
         try:
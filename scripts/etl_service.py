@@ -0,0 +1,293 @@
+# scripts/etl_service.py
+import argparse
+import json
+import logging
+import os
+import shutil
+import signal
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from advanced_etl_pipeline import AdvancedPropertyETL
+from cdc_log import CDCEventLog
+from database import DatabaseConnection
+from quarantine import QuarantineWriter
+
+INBOX_EXTENSIONS = ('.json', '.jsonl')
+
+
+class ServiceMetrics:
+    """Thread-safe counters exposed by the health endpoint"""
+
+    def __init__(self, latency_target):
+        self.latency_target = latency_target
+        self.started_at = time.time()
+        self.files_processed = 0
+        self.files_failed = 0
+        self.files_over_target = 0
+        self.last_file = None
+        self.last_latency = None
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, file_name, latency, succeeded):
+        """Record the outcome and latency of one processed file"""
+        with self.lock:
+            if succeeded:
+                self.files_processed += 1
+            else:
+                self.files_failed += 1
+            if latency > self.latency_target:
+                self.files_over_target += 1
+            self.last_file = file_name
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+            self.total_latency += latency
+
+    def snapshot(self):
+        """Return the current metrics as a dict"""
+        with self.lock:
+            completed = self.files_processed + self.files_failed
+            return {
+                'uptime_seconds': round(time.time() - self.started_at, 1),
+                'files_processed': self.files_processed,
+                'files_failed': self.files_failed,
+                'files_over_latency_target': self.files_over_target,
+                'latency_target_seconds': self.latency_target,
+                'last_file': self.last_file,
+                'last_latency_seconds': self.last_latency,
+                'max_latency_seconds': self.max_latency,
+                'avg_latency_seconds': self.total_latency / completed if completed else None
+            }
+
+
+class ETLService:
+    """Long-running ETL worker that loads files dropped into an inbox directory"""
+
+    def __init__(self, inbox_dir, processed_dir, failed_dir, quarantine_dir, cdc_dir=None,
+                 poll_interval=2.0, latency_target=30.0, use_mmap=True, workers=1, metric_formulas=None):
+        self.inbox_dir = inbox_dir
+        self.processed_dir = processed_dir
+        self.failed_dir = failed_dir
+        self.quarantine_dir = quarantine_dir
+        self.poll_interval = poll_interval
+        self.use_mmap = use_mmap
+        self.workers = workers
+        self.metric_formulas = metric_formulas
+        self.metrics = ServiceMetrics(latency_target)
+        self.db = DatabaseConnection()
+        self.cdc_log = CDCEventLog(cdc_dir) if cdc_dir else None
+        self.stop_event = threading.Event()
+        # File sizes seen on the previous poll; a file is only picked up once its size is stable
+        self.pending_sizes = {}
+        # Files that could not be moved out of the inbox; skipped so they are not reloaded every poll
+        self.unmovable = set()
+        # Connection state as last observed by the worker thread; the health endpoint only reads these
+        self.db_ok = False
+        self.last_db_ok_at = None
+
+        for directory in (inbox_dir, processed_dir, failed_dir, quarantine_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    def start(self, schema_path=None):
+        """Connect once and optionally create the schema before watching the inbox"""
+        if not self.db.connect():
+            raise RuntimeError("Could not connect to MySQL")
+        self.mark_db_ok()
+
+        if schema_path:
+            logging.info("Creating final database schema...")
+            self.db.execute_script(schema_path)
+
+    def mark_db_ok(self):
+        """Record that the worker thread just used the connection successfully"""
+        self.db_ok = True
+        self.last_db_ok_at = time.time()
+
+    def check_db(self):
+        """Ping (and if needed reconnect) from the worker thread, which owns the connection"""
+        if self.db.ensure_connected():
+            self.mark_db_ok()
+        else:
+            self.db_ok = False
+        return self.db_ok
+
+    def ready_files(self):
+        """Return non-empty inbox files whose size has not changed since the last poll"""
+        candidates = {}
+        for entry in os.scandir(self.inbox_dir):
+            if (entry.is_file() and entry.name.lower().endswith(INBOX_EXTENSIONS)
+                    and entry.path not in self.unmovable):
+                candidates[entry.path] = (entry.stat().st_size, entry.stat().st_mtime)
+
+        # Empty files are usually still being created; wait until they have content
+        ready = [path for path, (size, _) in candidates.items()
+                 if size > 0 and self.pending_sizes.get(path) == size]
+        self.pending_sizes = {path: size for path, (size, _) in candidates.items() if path not in ready}
+        return sorted(ready, key=lambda path: candidates[path][1])
+
+    def archive_name(self, file_name):
+        """Return a unique name for archiving a file, so repeated drops never overwrite each other"""
+        stem, ext = os.path.splitext(file_name)
+        return f"{stem}.{datetime.now().strftime('%Y%m%dT%H%M%S%f')}{ext}"
+
+    def process_file(self, file_path):
+        """Run the ETL stages for one inbox file and move it out of the inbox.
+
+        While MySQL is unreachable the file is left in the inbox and retried on a later poll. A file that
+        fails once loading has started goes to the failed directory: every insert batch commits on its own,
+        so batches before the failure are already in home_db and dropping the same file again would
+        duplicate them.
+        """
+        file_name = os.path.basename(file_path)
+
+        if not self.check_db():
+            logging.warning(f"MySQL is unreachable; leaving {file_name} in the inbox for the next poll")
+            return False
+
+        start = time.perf_counter()
+        succeeded = False
+        archive_name = self.archive_name(file_name)
+
+        try:
+            quarantine = QuarantineWriter(os.path.join(self.quarantine_dir, f"{archive_name}.rejected.jsonl"))
+            etl = AdvancedPropertyETL(self.db, cdc_log=self.cdc_log, quarantine=quarantine,
+                                      metric_formulas=self.metric_formulas)
+            etl.run_etl(file_path, use_mmap=self.use_mmap, workers=self.workers)
+            self.mark_db_ok()
+            succeeded = True
+
+        except Exception as e:
+            logging.error(f"Failed to process {file_name}: {e}")
+
+        latency = time.perf_counter() - start
+        self.metrics.record(file_name, latency, succeeded)
+
+        target_dir = self.processed_dir if succeeded else self.failed_dir
+        try:
+            shutil.move(file_path, os.path.join(target_dir, archive_name))
+        except OSError as e:
+            logging.error(f"Could not move {file_name} to {target_dir}: {e}; it will be skipped until restart")
+            self.unmovable.add(file_path)
+
+        if latency > self.metrics.latency_target:
+            logging.warning(f"{file_name} took {latency:.2f}s (target {self.metrics.latency_target:.2f}s)")
+        else:
+            logging.info(f"{file_name} processed in {latency:.2f}s")
+        return True
+
+    def run(self):
+        """Poll the inbox until stopped"""
+        logging.info(f"Watching {self.inbox_dir} for new files...")
+        while not self.stop_event.is_set():
+            # While MySQL is down the inbox is not scanned, so nothing is picked up or archived
+            if self.check_db():
+                ready = self.ready_files()
+                for position, file_path in enumerate(ready):
+                    if self.stop_event.is_set():
+                        break
+                    if not self.process_file(file_path):
+                        self.defer(ready[position:])
+                        break
+            self.stop_event.wait(self.poll_interval)
+
+    def defer(self, file_paths):
+        """Keep files ready so they are retried on the first poll after MySQL is back"""
+        for file_path in file_paths:
+            try:
+                self.pending_sizes[file_path] = os.path.getsize(file_path)
+            except OSError:
+                pass
+
+    def stop(self, *_):
+        """Ask the watch loop to exit after the current file"""
+        logging.info("Stopping ETL service...")
+        self.stop_event.set()
+
+    def close(self):
+        """Release the database connection"""
+        self.db.close()
+
+
+def make_health_handler(service):
+    """Build a request handler serving /health and /metrics for the service"""
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/health':
+                # Never touch the shared connection here: pinging it from this thread would interleave
+                # packets with the worker's queries
+                connected = service.db_ok
+                last_ok = service.last_db_ok_at
+                body = {
+                    'status': 'ok' if connected else 'degraded',
+                    'db_connected': connected,
+                    'seconds_since_db_ok': round(time.time() - last_ok, 1) if last_ok else None
+                }
+                status = 200 if connected else 503
+            elif self.path == '/metrics':
+                body = service.metrics.snapshot()
+                status = 200
+            else:
+                body = {'error': 'not found'}
+                status = 404
+
+            payload = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            # Keep health probes out of the ETL log
+            pass
+
+    return HealthHandler
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Run the property ETL as a directory-watching service")
+    parser.add_argument('--inbox', default='inbox', help="Directory to watch for .json/.jsonl drops")
+    parser.add_argument('--processed', default='inbox/processed', help="Where successfully loaded files are moved")
+    parser.add_argument('--failed', default='inbox/failed', help="Where files that failed to load are moved")
+    parser.add_argument('--quarantine', default='quarantine', help="Directory for per-file rejected rows")
+    parser.add_argument('--cdc-dir', default=None, help="Write CDC events to this directory")
+    parser.add_argument('--schema', default=None, help="Create the schema from this SQL file on startup")
+    parser.add_argument('--poll-interval', type=float, default=2.0, help="Seconds between inbox scans")
+    parser.add_argument('--latency-target', type=float, default=30.0, help="Per-file latency target in seconds")
+    parser.add_argument('--workers', type=int, default=1, help="Parser worker processes per JSONL file")
+    parser.add_argument('--metrics', default=None, help="Comma-separated derived metrics to compute (default: all)")
+    parser.add_argument('--host', default='127.0.0.1', help="Health endpoint bind address")
+    parser.add_argument('--port', type=int, default=8765, help="Health endpoint port")
+    args = parser.parse_args()
+
+    try:
+        metric_formulas = AdvancedPropertyETL.select_metric_formulas(args.metrics) if args.metrics else None
+    except ValueError as e:
+        parser.error(str(e))
+    service = ETLService(args.inbox, args.processed, args.failed, args.quarantine, cdc_dir=args.cdc_dir,
+                         poll_interval=args.poll_interval, latency_target=args.latency_target,
+                         workers=args.workers, metric_formulas=metric_formulas)
+    service.start(schema_path=args.schema)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_health_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Health endpoint on http://{args.host}:{args.port}/health and /metrics")
+
+    signal.signal(signal.SIGTERM, service.stop)
+    signal.signal(signal.SIGINT, service.stop)
+
+    try:
+        service.run()
+    finally:
+        server.shutdown()
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# scripts/quarantine.py
+import json
+import os
+from collections import Counter
+from datetime import datetime, timezone
+
+
+class QuarantineWriter:
+    """Append rejected payloads and rows, with the rejection reason, to a JSONL file"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.counts = Counter()
+        self.file = None
+
+    def record(self, stage, table, reason, payload, row_index=None):
+        """Write one rejected item to the quarantine file"""
+        if self.file is None:
+            directory = os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.file_path, 'a')
+
+        self.file.write(json.dumps({
+            'ts': datetime.now(timezone.utc).isoformat(),
+            'stage': stage,
+            'table': table,
+            'row_index': row_index,
+            'reason': reason,
+            'payload': payload
+        }, default=str) + '\n')
+        self.counts[table] += 1
+
+    def total(self):
+        """Number of items quarantined so far"""
+        return sum(self.counts.values())
+
+    def close(self):
+        """Flush and close the quarantine file"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
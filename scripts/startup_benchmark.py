@@ -0,0 +1,122 @@
+# scripts/startup_benchmark.py
+import argparse
+import ast
+import inspect
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+from cli import command_handlers
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr):
+    """Return (top-level cumulative microseconds, [(module, cumulative us)]) from -X importtime output"""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under their parent; only top-level entries are summed
+        if not name[1:].startswith(' '):
+            top_level.append((name.strip(), int(cumulative_us)))
+    return sum(us for _, us in top_level), top_level
+
+
+def handler_imports(handler):
+    """Return (always, optional) modules imported inside a CLI handler, read from its source.
+
+    Imports under an if, loop or except only run for some arguments and are reported as optional.
+    """
+    always, optional = [], []
+
+    def visit(node, conditional):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.Import):
+                modules = [alias.name for alias in child.names]
+            elif isinstance(child, ast.ImportFrom) and not child.level:
+                modules = [child.module]
+            else:
+                visit(child, conditional or isinstance(child, (ast.If, ast.For, ast.While, ast.ExceptHandler)))
+                continue
+            target = optional if conditional else always
+            target.extend(module for module in modules if module not in target)
+
+    visit(ast.parse(textwrap.dedent(inspect.getsource(handler))).body[0], False)
+    return always, [module for module in optional if module not in always]
+
+
+def measure(command, handler, repeat, include_optional=False):
+    """Measure cold-start import cost of the CLI plus the modules one subcommand's handler imports"""
+    always, optional = handler_imports(handler)
+    modules = always + optional if include_optional else always
+    statement = '; '.join(['import cli'] + [f"import {module}" for module in modules])
+    best = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                                cwd=SCRIPTS_DIR, capture_output=True, text=True)
+        wall_ms = (time.perf_counter() - start) * 1000
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing modules for '{command}' failed:\n{result.stderr.splitlines()[-1]}")
+
+        import_us, top_level = parse_importtime(result.stderr)
+        if best is None or wall_ms < best['wall_ms']:
+            best = {
+                'command': command,
+                'modules': modules,
+                'optional_modules': [] if include_optional else optional,
+                'wall_ms': round(wall_ms, 1),
+                'import_ms': round(import_us / 1000, 1),
+                'slowest_imports': [(name, round(us / 1000, 1))
+                                    for name, us in sorted(top_level, key=lambda item: -item[1])[:5]]
+            }
+    return best
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Track cold-start import time of each CLI subcommand")
+    handlers = command_handlers()
+    parser.add_argument('commands', nargs='*', default=list(handlers),
+                        help=f"Subcommands to measure (default: all of {', '.join(handlers)})")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per subcommand; the fastest is reported")
+    parser.add_argument('--with-optional', action='store_true',
+                        help="Also import modules a handler only loads for some options (e.g. load --cdc-dir)")
+    parser.add_argument('--budget-ms', type=float, default=None, help="Fail if any import time exceeds this")
+    parser.add_argument('--json', dest='json_output', default=None, help="Also write results to this file")
+    args = parser.parse_args()
+
+    unknown = [command for command in args.commands if command not in handlers]
+    if unknown:
+        parser.error(f"unknown subcommands: {', '.join(unknown)}")
+
+    results = [measure(command, handlers[command], args.repeat, args.with_optional) for command in args.commands]
+
+    for result in results:
+        print(f"{result['command']:<10} wall {result['wall_ms']:>8.1f} ms   imports {result['import_ms']:>8.1f} ms   "
+              f"({', '.join(result['modules'])})")
+        if result['optional_modules']:
+            print(f"{'':<12}not timed (option-dependent): {', '.join(result['optional_modules'])}")
+        for name, ms in result['slowest_imports']:
+            print(f"{'':<12}{name:<30}{ms:>8.1f} ms")
+
+    if args.json_output:
+        with open(args.json_output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.budget_ms is not None:
+        over_budget = [result['command'] for result in results if result['import_ms'] > args.budget_ms]
+        if over_budget:
+            print(f"Over {args.budget_ms} ms import budget: {', '.join(over_budget)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 -- Drop tables in dependency order
+DROP TABLE IF EXISTS property_metrics;
 DROP TABLE IF EXISTS rehab_details;
 DROP TABLE IF EXISTS rehab_estimates;
 DROP TABLE IF EXISTS valuation_details;
@@ -6,6 +7,17 @@ DROP TABLE IF EXISTS hoa_details;
 DROP TABLE IF EXISTS taxes;
 DROP TABLE IF EXISTS leads;
 DROP TABLE IF EXISTS properties;
+DROP TABLE IF EXISTS flag_values;
+
+-- Flag Values table (dictionary of repeated Yes/No style flag strings)
+CREATE TABLE flag_values (
+    -- Assigned by MySQL so concurrent loads never hand the same code to different strings
+    flag_id TINYINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    -- Binary collation so 'Yes' and 'yes' are distinct, matching the case-sensitive codes in the ETL
+    flag_value VARCHAR(50) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+
+    UNIQUE KEY unique_flag_value (flag_value)
+);
 
 -- Properties table (main entity with all property-specific fields)
 CREATE TABLE properties (
@@ -90,7 +102,7 @@ CREATE TABLE hoa_details (
     hoa_detail_id INT AUTO_INCREMENT PRIMARY KEY,
     property_id INT NOT NULL,
     hoa_fee DECIMAL(10,2),
-    hoa_flag VARCHAR(10),
+    hoa_flag TINYINT UNSIGNED,  -- flag_values.flag_id
     sequence_number INT DEFAULT 1,
 
     FOREIGN KEY (property_id) REFERENCES properties(property_id) ON DELETE CASCADE,
@@ -142,17 +154,29 @@ CREATE TABLE rehab_details (
     rehab_detail_id INT AUTO_INCREMENT PRIMARY KEY,
     rehab_estimate_id INT NOT NULL,
 
-    paint VARCHAR(10),
-    flooring_flag VARCHAR(10),
-    foundation_flag VARCHAR(10),
-    roof_flag VARCHAR(10),
-    hvac_flag VARCHAR(10),
-    kitchen_flag VARCHAR(10),
-    bathroom_flag VARCHAR(10),
-    appliances_flag VARCHAR(10),
-    windows_flag VARCHAR(10),
-    landscaping_flag VARCHAR(10),
-    trashout_flag VARCHAR(10),
+    -- Flag columns hold flag_values.flag_id codes (no FK, to avoid an index per column)
+    paint TINYINT UNSIGNED,
+    flooring_flag TINYINT UNSIGNED,
+    foundation_flag TINYINT UNSIGNED,
+    roof_flag TINYINT UNSIGNED,
+    hvac_flag TINYINT UNSIGNED,
+    kitchen_flag TINYINT UNSIGNED,
+    bathroom_flag TINYINT UNSIGNED,
+    appliances_flag TINYINT UNSIGNED,
+    windows_flag TINYINT UNSIGNED,
+    landscaping_flag TINYINT UNSIGNED,
+    trashout_flag TINYINT UNSIGNED,
 
     FOREIGN KEY (rehab_estimate_id) REFERENCES rehab_estimates(rehab_estimate_id) ON DELETE CASCADE
 );
+
+-- Property Metrics table (derived investment metrics computed during ETL)
+CREATE TABLE property_metrics (
+    property_id INT NOT NULL,
+    metric_name VARCHAR(50) NOT NULL,
+    metric_value DOUBLE,
+
+    PRIMARY KEY (property_id, metric_name),
+    FOREIGN KEY (property_id) REFERENCES properties(property_id) ON DELETE CASCADE,
+    INDEX idx_metric_name_value (metric_name, metric_value)
+);